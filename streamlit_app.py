@@ -1,13 +1,24 @@
 import os
-from collections import Counter
+from collections import defaultdict
 
+import numpy as np
+import pandas as pd
 import streamlit as st
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 # CONFIG
 
 PASSWORD_FILE = "ignis-1M.txt"
 TOP_N = 10
 TOP_LETTERS_PER_POSITION = 3
+SCORE_CHUNK_ROWS = 65536
+ENCODING = "ascii"
+ALPHABET_SIZE = 128  # Byte range of ASCII, width of all per-letter tables
+NO_MUST = 255  # Sentinel for "any letter", never a valid ASCII byte
 
 st.set_page_config(
     page_title="Kzon's Torn Cracking Tool",
@@ -17,93 +28,187 @@ st.set_page_config(
 
 # CORE LOGIC
 
-@st.cache_data(show_spinner=False)
 def load_passwords(path: str) -> list[str]:
-    """# Load dictionary and deduplicate"""
-    passwords = []
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        for line in f:
-            pw = line.strip()
-            if pw:
-                passwords.append(pw)
-    return list(dict.fromkeys(passwords))
-
-
-def filter_by_length(passwords: list[str], length: int) -> list[str]:
-    """# Filter words by selected length"""
-    return [pw for pw in passwords if len(pw) == length]
-
-
-def apply_constraints(base_candidates, must_positions, forbid_positions):
-    """# Apply known and forbidden letters to reduce candidate list"""
-    filtered = []
-    for pw in base_candidates:
-        ok = True
-        for i, ch in enumerate(pw):
-            must = must_positions[i]
-            if must is not None and ch != must:
-                ok = False
-                break
-            if forbid_positions[i] and ch in forbid_positions[i]:
-                ok = False
-                break
-        if ok:
-            filtered.append(pw)
-    return filtered
-
-
-def score_candidates(candidates: list[str]) -> list[tuple[str, float]]:
+    """# Load dictionary and deduplicate, only the length buckets are cached"""
+    with open(path, "rb") as f:
+        text = f.read().decode("utf-8", errors="ignore")
+    passwords = dict.fromkeys(map(str.strip, text.splitlines()))
+    passwords.pop("", None)
+    return list(passwords)
+
+
+@st.cache_resource(show_spinner=False)
+def load_by_length(path: str) -> dict[int, np.ndarray]:
+    """# Group dictionary into read-only (N, L) uint8 matrices by length"""
+    groups = defaultdict(list)
+    for pw in load_passwords(path):
+        if pw.isascii():
+            groups[len(pw)].append(pw)
+    return {
+        length: np.frombuffer(
+            "".join(words).encode(ENCODING), dtype=np.uint8
+        ).reshape(-1, length)
+        for length, words in groups.items()
+    }
+
+
+def to_strings(arr: np.ndarray) -> list[str]:
+    """# Decode matrix rows back into passwords"""
+    return [row.tobytes().decode(ENCODING) for row in arr]
+
+
+def column_order(counts, must_vec, forbid_mask):
+    """# Constrained columns, most rejecting first"""
+    kept = np.where(forbid_mask, 0, counts)
+    survivors = kept.sum(axis=1)
+    must_cols = np.flatnonzero(must_vec != NO_MUST)
+    survivors[must_cols] = kept[must_cols, must_vec[must_cols]]
+    cols = np.flatnonzero(survivors < counts[0].sum())
+    return cols[np.argsort(survivors[cols], kind="stable")]
+
+
+def apply_constraints(base_arr, counts, must_vec, forbid_mask):
+    """# Apply known and forbidden letters as a mask over candidate rows"""
+    order = column_order(counts, must_vec, forbid_mask)
+    if njit is not None:
+        return filter_fast(base_arr, must_vec, forbid_mask, order)
+
+    # Known letters in one pass against the pattern template, then forbidden
+    # letters column by column on the rows that are left
+    rows = np.arange(len(base_arr))
+    must_cols = np.flatnonzero(must_vec != NO_MUST)
+    if len(must_cols):
+        template = must_vec[must_cols]
+        rows = rows[(base_arr[:, must_cols] == template).all(axis=1)]
+    for c in order:
+        if forbid_mask[c].any():
+            rows = rows[~forbid_mask[c, base_arr[rows, c]]]
+    mask = np.zeros(len(base_arr), dtype=bool)
+    mask[rows] = True
+    return mask
+
+
+def narrow_mask(base_arr, mask, domain_counts, must_vec, new_must, new_forbid):
+    """# AND new constraints into the mask and recount the live letters"""
+    # domain_counts holds the letters still present at each position among
+    # live rows. Forbidding an absent letter, or requiring one every live
+    # row already has, cannot change the mask and is dropped up front. The
+    # same mask and counts objects are returned when nothing goes.
+    total = domain_counts[0].sum()
+    new_forbid = new_forbid & (domain_counts > 0)
+    new_must = new_must.copy()
+    must_cols = np.flatnonzero(new_must != NO_MUST)
+    settled = domain_counts[must_cols, new_must[must_cols]] == total
+    new_must[must_cols[settled]] = NO_MUST
+    if not new_forbid.any() and (new_must == NO_MUST).all():
+        return mask, domain_counts
+
+    rows = np.flatnonzero(mask)
+    live = base_arr[rows]
+    keep = apply_constraints(live, domain_counts, new_must, new_forbid)
+    mask = np.zeros(len(base_arr), dtype=bool)
+    mask[rows[keep]] = True
+    known = np.where(new_must != NO_MUST, new_must, must_vec)
+    return mask, compute_position_frequencies(live[keep], known)
+
+
+if njit is not None:
+
+    @njit(cache=True, boundscheck=False)
+    def filter_fast(arr, must_vec, forbid_mask, order):
+        """# Fused single-pass filter, stops at the first failing column"""
+        n = arr.shape[0]
+        out = np.empty(n, dtype=np.bool_)
+        for r in range(n):
+            ok = True
+            for c in order:
+                v = arr[r, c]
+                if must_vec[c] != NO_MUST and v != must_vec[c]:
+                    ok = False
+                    break
+                if forbid_mask[c, v]:
+                    ok = False
+                    break
+            out[r] = ok
+        return out
+
+
+def score_candidates(arr: np.ndarray, pos_freqs: np.ndarray) -> np.ndarray:
     """# Compute normalized score distribution"""
-    if not candidates:
-        return []
-
-    all_chars = "".join(candidates)
-    char_freq = Counter(all_chars)
-    total_chars = sum(char_freq.values())
-
-    if total_chars == 0:
-        equal = 1.0 / len(candidates)
-        return [(pw, equal) for pw in candidates]
-
-    char_prob = {ch: cnt / total_chars for ch, cnt in char_freq.items()}
-
-    raw_scores = []
-    for pw in candidates:
-        unique_chars = set(pw)
-        raw_score = sum(char_prob.get(c, 0.0) for c in unique_chars)
-        raw_scores.append((pw, raw_score))
-
-    total_raw = sum(v for _, v in raw_scores)
+    if not len(arr):
+        return np.zeros(0)
+
+    # Overall character counts are the per-position counts summed up
+    char_freq = pos_freqs.sum(axis=0)
+    char_prob = char_freq / char_freq.sum()
+
+    # Sum each character once per password: sort rows and keep the first
+    # occurrence of every run of equal bytes. Rows go in fixed-size chunks
+    # so the temporaries stay bounded however large the dictionary is.
+    raw_scores = np.empty(len(arr))
+    for start in range(0, len(arr), SCORE_CHUNK_ROWS):
+        chunk = np.sort(arr[start:start + SCORE_CHUNK_ROWS], axis=1)
+        unique = np.ones(chunk.shape, dtype=bool)
+        unique[:, 1:] = chunk[:, 1:] != chunk[:, :-1]
+        raw_scores[start:start + len(chunk)] = np.where(
+            unique, char_prob[chunk], 0.0
+        ).sum(axis=1)
+
+    total_raw = raw_scores.sum()
     if total_raw <= 0:
-        equal = 1.0 / len(candidates)
-        return [(pw, equal) for pw, _ in raw_scores]
+        return np.full(len(arr), 1.0 / len(arr))
+    return raw_scores / total_raw
 
-    scored = [(pw, v / total_raw) for pw, v in raw_scores]
-    scored.sort(key=lambda x: x[1], reverse=True)
-    return scored
 
-
-def compute_position_frequencies(candidates: list[str]):
+def compute_position_frequencies(arr: np.ndarray, must_vec) -> np.ndarray:
     """# Compute per-position character frequencies"""
-    if not candidates:
-        return []
-
-    length = len(candidates[0])
-    pos_freqs = [Counter() for _ in range(length)]
-    for pw in candidates:
-        for i, ch in enumerate(pw):
-            pos_freqs[i][ch] += 1
-    return pos_freqs
-
-
-def format_forbid_map(forbid_positions):
+    length = arr.shape[1]
+    counts = np.zeros((length, ALPHABET_SIZE), dtype=np.int32)
+    for i in range(length):
+        # Every candidate holds the known letter, no need to scan the column
+        if must_vec[i] != NO_MUST:
+            counts[i, must_vec[i]] = len(arr)
+        else:
+            counts[i] = np.bincount(arr[:, i], minlength=ALPHABET_SIZE)
+    return counts
+
+
+def top_indices(values: np.ndarray, k: int) -> np.ndarray:
+    """# Indices of the k largest values, ties kept in original order"""
+    k = min(k, len(values))
+    if k == 0:
+        return np.zeros(0, dtype=np.intp)
+    top = np.argpartition(-values, k - 1)[:k]
+    # Widen to everything tied with the k-th value so the cut is stable
+    top = np.flatnonzero(values >= values[top].min())
+    return top[np.argsort(-values[top], kind="stable")][:k]
+
+
+def top_letters(arr: np.ndarray, pos_freqs: np.ndarray, k: int):
+    """# Top letters per position, ties in order of first appearance"""
+    letters = []
+    for i, freq in enumerate(pos_freqs):
+        present = np.flatnonzero(freq)
+        if not len(present):
+            letters.append([])
+            continue
+        cutoff = np.sort(freq[present])[-min(k, len(present))]
+        tied = present[freq[present] >= cutoff]
+        first_seen = [np.argmax(arr[:, i] == c) for c in tied]
+        tied = tied[np.lexsort((first_seen, -freq[tied]))]
+        letters.append(tied[:k].tolist())
+    return letters
+
+
+def format_forbid_map(forbid_mask):
     """# Format forbidden letters display"""
     parts = []
-    for s in forbid_positions:
-        if not s:
+    for row in forbid_mask:
+        codes = np.flatnonzero(row)
+        if not len(codes):
             parts.append(".")
         else:
-            parts.append("{" + "".join(sorted(s)) + "}")
+            parts.append("{" + "".join(map(chr, codes)) + "}")
     return "".join(parts)
 
 
@@ -116,7 +221,7 @@ if not os.path.exists(pw_path):
     st.error(f"Password file not found: `{pw_path}`")
     st.stop()
 
-all_passwords = load_passwords(pw_path)
+buckets = load_by_length(pw_path)
 
 
 # UI
@@ -159,39 +264,53 @@ start_search = st.button("Start / reset search", type="primary")
 
 if "current_length" not in st.session_state:
     st.session_state.current_length = None
-    st.session_state.base_candidates = None
-    st.session_state.current_candidates = None
-    st.session_state.must_positions = None
-    st.session_state.forbid_positions = None
+    st.session_state.base_arr = None
+    st.session_state.mask = None
+    st.session_state.domain_counts = None
+    st.session_state.must_vec = None
+    st.session_state.forbid_mask = None
+    st.session_state.constraint_version = 0
+    st.session_state.scored_version = None
+    st.session_state.scored = None
+    st.session_state.forbid_str_cache = None
 
 
 if start_search:
-    base_candidates = filter_by_length(all_passwords, length)
-    if not base_candidates:
+    base_arr = buckets.get(length)
+    if base_arr is None:
         st.warning(f"No passwords found with length {length}.")
     else:
+        must_vec = np.full(length, NO_MUST, dtype=np.uint8)
+        domain_counts = compute_position_frequencies(base_arr, must_vec)
         st.session_state.current_length = length
-        st.session_state.base_candidates = base_candidates
-        st.session_state.must_positions = [None] * length
-        st.session_state.forbid_positions = [set() for _ in range(length)]
-        st.session_state.current_candidates = base_candidates[:]
+        st.session_state.base_arr = base_arr
+        st.session_state.must_vec = must_vec
+        st.session_state.forbid_mask = np.zeros(
+            (length, ALPHABET_SIZE), dtype=bool
+        )
+        st.session_state.mask = np.ones(len(base_arr), dtype=bool)
+        st.session_state.domain_counts = domain_counts
+        st.session_state.forbid_str_cache = None
+        st.session_state.constraint_version += 1
 
 
-if st.session_state.current_candidates is None:
+if st.session_state.mask is None:
     st.stop()
 
 current_length = st.session_state.current_length
-must_positions = st.session_state.must_positions
-forbid_positions = st.session_state.forbid_positions
-current_candidates = st.session_state.current_candidates
+must_vec = st.session_state.must_vec
+forbid_mask = st.session_state.forbid_mask
+base_arr = st.session_state.base_arr
 
 
 # CONSTRAINTS UI
 
 st.markdown("### Constraints")
 
-must_str = "".join(c if c is not None else "." for c in must_positions)
-forbid_str = format_forbid_map(forbid_positions)
+must_str = "".join("." if c == NO_MUST else chr(c) for c in must_vec)
+if st.session_state.forbid_str_cache is None:
+    st.session_state.forbid_str_cache = format_forbid_map(forbid_mask)
+forbid_str = st.session_state.forbid_str_cache
 
 st.markdown(f"**Known pattern:** `{must_str}`")
 st.markdown(f"**Forbidden map:** `{forbid_str}`")
@@ -219,41 +338,66 @@ with col_d:
 if apply_a:
     if len(pattern_a) != current_length:
         st.error(f"Pattern length must be {current_length}.")
+    elif not pattern_a.isascii():
+        st.error("Pattern must only contain ASCII characters.")
     else:
+        new_must = np.full(current_length, NO_MUST, dtype=np.uint8)
         for i, ch in enumerate(pattern_a):
-            if ch == ".":
+            if ch == "." or must_vec[i] == ord(ch):
                 continue
-            if must_positions[i] is not None and must_positions[i] != ch:
+            if must_vec[i] != NO_MUST:
                 st.warning(
                     f"Conflict at position {i+1}. Keeping existing letter."
                 )
                 continue
-            must_positions[i] = ch
-
-        st.session_state.current_candidates = apply_constraints(
-            st.session_state.base_candidates,
-            must_positions,
-            forbid_positions,
+            new_must[i] = ord(ch)
+
+        mask, domain_counts = narrow_mask(
+            base_arr,
+            st.session_state.mask,
+            st.session_state.domain_counts,
+            must_vec,
+            new_must,
+            np.zeros_like(forbid_mask),
         )
-        current_candidates = st.session_state.current_candidates
+        # Store the mask before recording the letters, so the letters never
+        # get ahead of it. Cached scores stay when no candidate was removed.
+        if mask is not st.session_state.mask:
+            st.session_state.mask = mask
+            st.session_state.domain_counts = domain_counts
+            st.session_state.constraint_version += 1
+        must_vec[new_must != NO_MUST] = new_must[new_must != NO_MUST]
 
 
 # Forbidden pattern
 if apply_d:
     if len(pattern_d) != current_length:
         st.error(f"Pattern length must be {current_length}.")
+    elif not pattern_d.isascii():
+        st.error("Pattern must only contain ASCII characters.")
     else:
+        new_forbid = np.zeros_like(forbid_mask)
         for i, ch in enumerate(pattern_d):
-            if ch == ".":
+            if ch == "." or forbid_mask[i, ord(ch)]:
                 continue
-            forbid_positions[i].add(ch)
-
-        st.session_state.current_candidates = apply_constraints(
-            st.session_state.base_candidates,
-            must_positions,
-            forbid_positions,
+            new_forbid[i, ord(ch)] = True
+
+        mask, domain_counts = narrow_mask(
+            base_arr,
+            st.session_state.mask,
+            st.session_state.domain_counts,
+            must_vec,
+            np.full(current_length, NO_MUST, dtype=np.uint8),
+            new_forbid,
         )
-        current_candidates = st.session_state.current_candidates
+        # Store the mask before recording the letters, so the letters never
+        # get ahead of it. Cached scores stay when no candidate was removed.
+        if mask is not st.session_state.mask:
+            st.session_state.mask = mask
+            st.session_state.domain_counts = domain_counts
+            st.session_state.constraint_version += 1
+        forbid_mask |= new_forbid
+        st.session_state.forbid_str_cache = None
 
 
 # CANDIDATES DISPLAY
@@ -261,48 +405,63 @@ if apply_d:
 st.markdown("---")
 st.markdown("### Candidates & probabilities")
 
-if not current_candidates:
+# Scores only change with the constraints, so reruns reuse the last result
+if st.session_state.scored_version != st.session_state.constraint_version:
+    current_candidates = base_arr[st.session_state.mask]
+    scores = score_candidates(
+        current_candidates, st.session_state.domain_counts
+    )
+    top = top_indices(scores, TOP_N)
+    st.session_state.scored = {
+        "total": len(current_candidates),
+        "table": pd.DataFrame({
+            "Password": to_strings(current_candidates[top]),
+            "Score (%)": np.char.mod("%.5f", scores[top] * 100),
+        }),
+        "letters": top_letters(
+            current_candidates,
+            st.session_state.domain_counts,
+            TOP_LETTERS_PER_POSITION,
+        ),
+    }
+    st.session_state.scored_version = st.session_state.constraint_version
+
+scored = st.session_state.scored
+total = scored["total"]
+if not total:
     st.error("No possible passwords remain.")
     st.stop()
 
-scored = score_candidates(current_candidates)
-limit = min(TOP_N, len(scored))
+limit = len(scored["table"])
 
-st.write(f"Total candidates: **{len(current_candidates)}**")
+st.write(f"Total candidates: **{total}**")
 st.write(f"Showing top **{limit}** options:")
 
-rows = [
-    {"Password": pw, "Score (%)": f"{score * 100:.5f}"}
-    for pw, score in scored[:limit]
-]
-st.table(rows)
+st.table(scored["table"])
 
 
 # POSITION FREQUENCIES
 
 st.markdown("### Letter frequencies by position")
 
-pos_freqs = compute_position_frequencies(current_candidates)
-total = len(current_candidates)
+pos_freqs = st.session_state.domain_counts
 
 lines = []
 any_printed = False
 
 for idx in range(current_length):
-    if must_positions[idx] is not None:
+    if must_vec[idx] != NO_MUST:
         continue
 
     freq = pos_freqs[idx]
-    if not freq:
+    top = scored["letters"][idx]
+    if not top:
         continue
 
     any_printed = True
-    sorted_letters = sorted(freq.items(), key=lambda x: x[1], reverse=True)
-    top = sorted_letters[:TOP_LETTERS_PER_POSITION]
-
     parts = [
-        f"`{ch}` ({count / total * 100:.1f}%)"
-        for ch, count in top
+        f"`{chr(c)}` ({freq[c] / total * 100:.1f}%)"
+        for c in top
     ]
     lines.append(f"- **Pos {idx+1}**: " + ", ".join(parts))
 